@@ -2,10 +2,14 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+import hashlib
+import os
 from io import BytesIO
 from src.styles import set_style, show_logo, kpi_card
-from src.data_processing import clean_name, compute_kpis
+from src.data_processing import clean_name, compute_kpis, cached_sketches, rollup_sketches, merge_sketches, percentile_table, PERCENTILES, load_workbooks
 from src.ppt_export import create_ppt
+from src import sql_backend
+from src.charts import paginated_table, sla_colors
 import plotly.express as px
 import plotly.figure_factory as ff
 
@@ -31,6 +35,10 @@ defaults = {
     "theme": "Light",
     "decimal_places": 1,
     "page": "Dashboard",
+    "use_sql_backend": False,
+    "upload_key": None,
+    "duration_sketches": {},
+    "ingest_report": pd.DataFrame(),
     "universal_search": ""
 }
 for key, val in defaults.items():
@@ -68,25 +76,68 @@ st.text_input(
     label_visibility="collapsed"
 )
 
+# -------------------------------
+# SQL STORE (OPTIONAL DUCKDB BACKEND)
+# -------------------------------
+def use_sql_backend():
+    return st.session_state.use_sql_backend and sql_backend.DUCKDB_AVAILABLE
+
+def store_dir():
+    if "sql_store" not in st.session_state:
+        st.session_state.sql_store = sql_backend.new_store()
+    return os.path.join(st.session_state.sql_store.name, "tickets")
+
+def has_data():
+    return not st.session_state.data.empty or sql_backend.store_exists(store_dir())
+
 # -------------------------------
 # FILE UPLOAD
 # -------------------------------
-st.markdown("## Upload your Excel file")
+st.markdown("## Upload your Excel files")
 
-uploaded_file = st.file_uploader(
-    "Choose an Excel file (.xlsx)",
-    type="xlsx"
+uploaded_files = st.file_uploader(
+    "Choose one or more Excel files (.xlsx)",
+    type="xlsx",
+    accept_multiple_files=True
 )
 
-if uploaded_file is not None:
-    df = pd.read_excel(uploaded_file)
-    st.session_state.data = df.copy()
-
+if uploaded_files:
+    files = [(f.name, f.getvalue()) for f in uploaded_files]
+    digest = hashlib.sha1()
+    for name, content in files:
+        digest.update(name.encode())
+        digest.update(hashlib.sha1(content).digest())
+    upload_key = (digest.hexdigest(), use_sql_backend())
+
+    if st.session_state.upload_key != upload_key:
+        with st.spinner("Reading workbooks..."):
+            df, ingest_report = load_workbooks(files)
+        if df.empty:
+            st.error("No tickets could be read from the uploaded files.")
+            st.dataframe(ingest_report, use_container_width=True)
+            st.stop()
+        st.session_state.ingest_report = ingest_report
+        # Keep the tickets either in the session or in the Parquet store, never both
+        if use_sql_backend():
+            sql_backend.write_store(df, store_dir())
+            st.session_state.data = pd.DataFrame()
+        else:
+            sql_backend.clear_store(store_dir())
+            st.session_state.data = df.copy()
+        st.session_state.upload_key = upload_key
+        del df
+
+    with st.expander("Ingestion report"):
+        st.dataframe(st.session_state.ingest_report, use_container_width=True)
     with st.expander("Preview uploaded data"):
-        st.dataframe(df.head(), use_container_width=True)
-
-elif st.session_state.data.empty:
-    st.info("📂 Please upload an Excel file to proceed.")
+        if st.session_state.data.empty:
+            st.caption("First 1,000 rows from the SQL store")
+            paginated_table(sql_backend.load_store(store_dir(), limit=1000), key="upload_preview")
+        else:
+            paginated_table(st.session_state.data, key="upload_preview")
+
+elif not has_data():
+    st.info("📂 Please upload one or more Excel files to proceed.")
     st.stop()
 
 
@@ -116,7 +167,7 @@ def anonymize(df, columns):
 # -------------------------------
 # KPI & SUMMARY FUNCTIONS
 # -------------------------------
-def calculate_monthly_summary(df):
+def calculate_monthly_summary(df, sketch_cache=None):
     if 'Start date' in df.columns:
         df['Start date'] = pd.to_datetime(df['Start date'], errors='coerce')
         df['Month'] = df['Start date'].dt.to_period('M').astype(str)
@@ -124,6 +175,8 @@ def calculate_monthly_summary(df):
         df['Month'] = 'Unknown'
 
     df = compute_kpis(df)
+    # Percentile sketches only for callers that keep a cache (raw durations, before zero-fill)
+    sketches = cached_sketches(df, sketch_cache) if sketch_cache is not None else {}
     df['Duration (days)'] = pd.to_numeric(df.get('Duration (days)', 0), errors='coerce').fillna(0)
 
     monthly_summary = (
@@ -152,7 +205,11 @@ def calculate_monthly_summary(df):
     monthly_summary['SLA %'] = ((monthly_summary['SLA TTO Done'] + monthly_summary['SLA TTR Done']) / (2 * monthly_summary['Total Tickets']) * 100).round(1)
     monthly_summary['Avg Resolution Days'] = monthly_summary['Avg Resolution Days'].fillna(0)
 
-    return df, monthly_summary
+    if sketches:
+        percentiles = percentile_table(rollup_sketches(sketches, ['Month']), ['Month']).drop(columns='Resolved Tickets')
+        monthly_summary = monthly_summary.merge(percentiles, on='Month', how='left')
+
+    return df, monthly_summary, sketches
 
 def top_performers(df, role_col):
     summary = (
@@ -166,11 +223,7 @@ def top_performers(df, role_col):
     return summary, top5
 
 def style_sla(df, column='SLA %'):
-    def color(val):
-        if val >= 90: return "green"
-        elif val >= 75: return "orange"
-        else: return "red"
-    return df.style.applymap(lambda x: f"color:{color(x)}; font-weight:bold", subset=[column])
+    return df.style.apply(sla_colors, subset=[column])
 
 # -------------------------------
 # UNIVERSAL SEARCH FUNCTION
@@ -191,19 +244,25 @@ def apply_universal_search(df):
 # -------------------------------
 # FILTER LAST 3 MONTHS
 # -------------------------------
+def three_months_ago():
+    return pd.Timestamp.today() - pd.DateOffset(months=3)
+
 def filter_last_3_months(df):
     if 'Start date' in df.columns:
-        today = pd.Timestamp.today()
-        three_months_ago = today - pd.DateOffset(months=3)
-        df_filtered = df[df['Start date'] >= three_months_ago]
+        df_filtered = df[df['Start date'] >= three_months_ago()]
         return df_filtered
     return df
 
 # -------------------------------
 # PREPARE DATA FUNCTION
 # -------------------------------
+def load_data():
+    if st.session_state.data.empty and sql_backend.store_exists(store_dir()):
+        return sql_backend.load_store(store_dir())
+    return st.session_state.data.copy()
+
 def prepare_data():
-    data = st.session_state.data.copy()
+    data = load_data()
     data = clean_data(data)
     data = apply_universal_search(data)
     data = filter_last_3_months(data)
@@ -227,7 +286,7 @@ page = st.session_state.page
 # =====================================================
 if page == "Dashboard":
     data = prepare_data()
-    data, monthly_summary = calculate_monthly_summary(data)
+    data, monthly_summary, sketches = calculate_monthly_summary(data, st.session_state.duration_sketches)
 
     if st.session_state.show_kpis:
         st.markdown("### Key Metrics")
@@ -239,6 +298,12 @@ if page == "Dashboard":
         c5.metric("Closure %", f"{monthly_summary['Closure %'].mean():.1f}%")
         c6.metric("SLA Compliance %", f"{monthly_summary['SLA %'].mean():.1f}%")
 
+        overall = merge_sketches(sketches.values())
+        p1, p2, p3 = st.columns(3)
+        for col, (label, q) in zip([p1, p2, p3], PERCENTILES.items()):
+            value = overall.quantile(q)
+            col.metric(f"{label} Resolution Days", "-" if pd.isna(value) else f"{value:.1f}")
+
 # =====================================================
 # ADVANCED ANALYTICS PAGE
 # =====================================================
@@ -247,7 +312,7 @@ elif page == "Advanced Analytics":
     st.markdown('<h4 class="page-subtitle">Explore trends, correlations, and performance metrics</h4>', unsafe_allow_html=True)
 
     data = prepare_data()
-    data, monthly_summary = calculate_monthly_summary(data)
+    data, monthly_summary, _ = calculate_monthly_summary(data)
 
     # SLA vs Duration Scatter
     st.markdown("## SLA vs Resolution Days")
@@ -306,80 +371,125 @@ elif page == "Data Explorer":
     st.markdown('<h1 class="page-title">DATA EXPLORER</h1>', unsafe_allow_html=True)
     st.markdown('<h4 class="page-subtitle">Search, filter, and analyze your ticket data</h4>', unsafe_allow_html=True)
 
-    data = prepare_data()
-    data, monthly_summary = calculate_monthly_summary(data)
-
-    if data.empty:
-        st.warning("No data available.")
-        st.stop()
+    # With the SQL backend, cleaning, search, the date window and filters run
+    # in DuckDB over the Parquet store and only query results come back.
+    use_sql = use_sql_backend() and sql_backend.store_exists(store_dir())
+    if use_sql:
+        con = sql_backend.connect(
+            store_dir(),
+            search=st.session_state.get("universal_search", ""),
+            since=three_months_ago(),
+            anonymize_columns=st.session_state.sensitive_columns if st.session_state.anonymize_data else ()
+        )
+        data = pd.DataFrame(columns=sql_backend.columns(con))
+        no_data = sql_backend.count_rows(con) == 0
+    else:
+        data = prepare_data()
+        data, monthly_summary, _ = calculate_monthly_summary(data)
+        no_data = data.empty
 
-    # KPI Cards
-    total_tickets = len(data)
-    closed_tickets = data['Done Tasks'].sum() if 'Done Tasks' in data.columns else 0
-    pending_tickets = data['Pending Tasks'].sum() if 'Pending Tasks' in data.columns else 0
-    avg_sla = data['SLA %'].mean() if 'SLA %' in data.columns else 0
-    avg_duration = data['Duration (days)'].mean() if 'Duration (days)' in data.columns else 0
-
-    st.markdown("### Key Metrics")
-    c1, c2, c3, c4, c5, c6 = st.columns(6)
-    c1.metric("Total Tickets", total_tickets)
-    c2.metric("Closed Tickets", closed_tickets)
-    c3.metric("Pending Tickets", pending_tickets)
-    c4.metric("Avg SLA %", f"{avg_sla:.1f}%")
-    c5.metric("Avg Resolution Days", f"{avg_duration:.1f}")
-    c6.metric("SLA Violations", total_tickets - closed_tickets)
-
-    # Filters
-    st.markdown("### Filters")
-    col1, col2, col3, col4 = st.columns(4)
-    with col1:
-        companies = st.multiselect("Company", data['Company Name'].dropna().unique())
-    with col2:
-        techs = st.multiselect("Technician", data['Technician Name'].dropna().unique())
-    with col3:
-        callers = st.multiselect("Caller", data['Caller Name'].dropna().unique())
-    with col4:
-        ticket_status = st.selectbox("Ticket Status", ['All', 'Closed', 'Pending'])
-
-    # Apply filters
-    if companies:
-        data = data[data['Company Name'].isin(companies)]
-    if techs:
-        data = data[data['Technician Name'].isin(techs)]
-    if callers:
-        data = data[data['Caller Name'].isin(callers)]
-    if ticket_status == 'Closed':
-        data = data[data['Done Tasks'] > 0]
-    elif ticket_status == 'Pending':
-        data = data[data['Pending Tasks'] > 0]
-
-    if data.empty:
-        st.warning("No data matches your filters.")
-        st.stop()
+    try:
+        if no_data:
+            st.warning("No data available.")
+            st.stop()
+
+        # KPI Cards
+        if use_sql:
+            kpis = sql_backend.query_kpis(con)
+            total_tickets = kpis['total_tickets']
+            closed_tickets = kpis['closed_tickets']
+            pending_tickets = kpis['pending_tickets']
+            avg_sla = kpis['avg_sla']
+            avg_duration = kpis['avg_duration']
+        else:
+            total_tickets = len(data)
+            closed_tickets = data['Done Tasks'].sum() if 'Done Tasks' in data.columns else 0
+            pending_tickets = data['Pending Tasks'].sum() if 'Pending Tasks' in data.columns else 0
+            avg_sla = data['SLA %'].mean() if 'SLA %' in data.columns else 0
+            avg_duration = data['Duration (days)'].mean() if 'Duration (days)' in data.columns else 0
 
-    # Charts
-    st.markdown("### Ticket Status Distribution")
-    fig_pie = px.pie(
-        names=['Closed','Pending'],
-        values=[closed_tickets, pending_tickets],
-        color=['Closed','Pending'],
-        color_discrete_map={'Closed':'green','Pending':'orange'},
-        hole=0.3
-    )
-    st.plotly_chart(fig_pie, use_container_width=True)
-
-    st.markdown("### Top 5 Technicians by SLA %")
-    if 'Technician Name' in data.columns:
-        _, top_techs = top_performers(data, 'Technician Name')
-        fig_bar = px.bar(
-            top_techs,
-            x='Technician Name',
-            y='SLA %',
-            text='SLA %',
-            color='SLA %',
-            color_continuous_scale='Tealgrn'
+        st.markdown("### Key Metrics")
+        c1, c2, c3, c4, c5, c6 = st.columns(6)
+        c1.metric("Total Tickets", total_tickets)
+        c2.metric("Closed Tickets", closed_tickets)
+        c3.metric("Pending Tickets", pending_tickets)
+        c4.metric("Avg SLA %", f"{avg_sla:.1f}%")
+        c5.metric("Avg Resolution Days", f"{avg_duration:.1f}")
+        c6.metric("SLA Violations", total_tickets - closed_tickets)
+
+        # Filters
+        def filter_options(col):
+            if use_sql:
+                return sql_backend.distinct_values(con, col)
+            return data[col].dropna().unique()
+
+        st.markdown("### Filters")
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            companies = st.multiselect("Company", filter_options('Company Name'))
+        with col2:
+            techs = st.multiselect("Technician", filter_options('Technician Name'))
+        with col3:
+            callers = st.multiselect("Caller", filter_options('Caller Name'))
+        with col4:
+            ticket_status = st.selectbox("Ticket Status", ['All', 'Closed', 'Pending'])
+
+        # Apply filters
+        if use_sql:
+            filters = {
+                'Company Name': companies,
+                'Technician Name': techs,
+                'Caller Name': callers,
+                'Ticket Status': ticket_status
+            }
+            no_match = sql_backend.count_rows(con, filters) == 0
+        else:
+            if companies:
+                data = data[data['Company Name'].isin(companies)]
+            if techs:
+                data = data[data['Technician Name'].isin(techs)]
+            if callers:
+                data = data[data['Caller Name'].isin(callers)]
+            if ticket_status == 'Closed':
+                data = data[data['Done Tasks'] > 0]
+            elif ticket_status == 'Pending':
+                data = data[data['Pending Tasks'] > 0]
+            no_match = data.empty
+
+        if no_match:
+            st.warning("No data matches your filters.")
+            st.stop()
+
+        # Charts
+        st.markdown("### Ticket Status Distribution")
+        fig_pie = px.pie(
+            names=['Closed','Pending'],
+            values=[closed_tickets, pending_tickets],
+            color=['Closed','Pending'],
+            color_discrete_map={'Closed':'green','Pending':'orange'},
+            hole=0.3
         )
-        st.plotly_chart(fig_bar, use_container_width=True)
+        st.plotly_chart(fig_pie, use_container_width=True)
+
+        st.markdown("### Top 5 Technicians by SLA %")
+        if 'Technician Name' in data.columns:
+            if use_sql:
+                _, top_techs = sql_backend.query_top_performers(con, 'Technician Name', filters)
+            else:
+                _, top_techs = top_performers(data, 'Technician Name')
+            fig_bar = px.bar(
+                top_techs,
+                x='Technician Name',
+                y='SLA %',
+                text='SLA %',
+                color='SLA %',
+                color_continuous_scale='Tealgrn'
+            )
+            st.plotly_chart(fig_bar, use_container_width=True)
+
+    finally:
+        if use_sql:
+            con.close()
 
 # =====================================================
 # EXPORT CENTER PAGE
@@ -392,6 +502,13 @@ elif page == "Export Center":
     monthly_summary = st.session_state.get("monthly_summary", pd.DataFrame())
     tech_summary = st.session_state.get("tech_summary", pd.DataFrame())
     caller_summary = st.session_state.get("caller_summary", pd.DataFrame())
+    sketches = {}
+    if not data.empty:
+        _, data_summary, sketches = calculate_monthly_summary(data.copy(), st.session_state.duration_sketches)
+        if monthly_summary.empty:
+            monthly_summary = data_summary
+    tech_percentiles = percentile_table(rollup_sketches(sketches, ['Technician Name']), ['Technician Name'])
+    company_percentiles = percentile_table(rollup_sketches(sketches, ['Company Name']), ['Company Name'])
 
     if data.empty and monthly_summary.empty and (tech_summary.empty if tech_summary is not None else True) \
        and (caller_summary.empty if caller_summary is not None else True):
@@ -410,6 +527,10 @@ elif page == "Export Center":
             tech_summary.to_excel(writer, sheet_name='Technician_Summary', index=False)
         if caller_summary is not None and not caller_summary.empty:
             caller_summary.to_excel(writer, sheet_name='Caller_Summary', index=False)
+        if not tech_percentiles.empty:
+            tech_percentiles.to_excel(writer, sheet_name='Technician_Percentiles', index=False)
+        if not company_percentiles.empty:
+            company_percentiles.to_excel(writer, sheet_name='Company_Percentiles', index=False)
     st.download_button("Download Excel", output.getvalue(), "analytics_report.xlsx")
 
     # PowerPoint Export
@@ -417,7 +538,9 @@ elif page == "Export Center":
     tables_dict = {
         'Monthly KPI': monthly_summary,
         'Technician-wise KPI': tech_summary,
-        'Caller-wise KPI': caller_summary
+        'Caller-wise KPI': caller_summary,
+        'Technician Resolution Percentiles': tech_percentiles,
+        'Company Resolution Percentiles': company_percentiles
     }
     try:
         prs = create_ppt(tables_dict)
@@ -444,14 +567,28 @@ elif page == "Settings":
     # Data Privacy
     st.markdown("### Data Privacy")
     st.session_state.anonymize_data = st.checkbox("Anonymize Sensitive Data", value=st.session_state.anonymize_data)
-    if st.session_state.anonymize_data and not st.session_state.data.empty:
+    if st.session_state.anonymize_data and has_data():
+        if st.session_state.data.empty:
+            column_options = sql_backend.store_columns(store_dir()) + ['Technician Name', 'Caller Name', 'Company Name']
+        else:
+            column_options = st.session_state.data.columns.tolist()
         sensitive_columns = st.multiselect(
             "Select Columns to Anonymize",
-            options=st.session_state.data.columns.tolist(),
+            options=list(dict.fromkeys(column_options)),
             default=st.session_state.sensitive_columns
         )
         st.session_state.sensitive_columns = sensitive_columns
 
+    # Query Engine
+    st.markdown("### Query Engine")
+    if sql_backend.DUCKDB_AVAILABLE:
+        st.session_state.use_sql_backend = st.checkbox(
+            "Use embedded SQL engine (DuckDB) for Data Explorer",
+            value=st.session_state.use_sql_backend
+        )
+    else:
+        st.caption("Install `duckdb` to enable the embedded SQL engine for Data Explorer.")
+
     # Report Formatting
     st.markdown("### Report Formatting")
     st.session_state.decimal_places = st.slider("Decimal Places in Reports", 0, 3, value=st.session_state.decimal_places)
@@ -473,7 +610,8 @@ elif page == "Settings":
                 "anonymize_data": False,
                 "sensitive_columns": ['Technician Name', 'Caller Name', 'Company Name'],
                 "decimal_places": 1,
-                "theme": "Light"
+                "theme": "Light",
+                "use_sql_backend": False
             })
             st.success("Settings reset to default")
             st.experimental_rerun()
@@ -1,7 +1,53 @@
 # src/charts.py
+import math
+import numpy as np
 import streamlit as st
 import pandas as pd
 
+def sla_colors(values):
+    """Column-level SLA coloring: green >= 90, orange >= 75, else red"""
+    values = pd.to_numeric(values, errors='coerce')
+    colors = np.select([values >= 90, values >= 75], ["green", "orange"], default="red")
+    return [f"color:{c}; font-weight:bold" for c in colors]
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def sort_order(df, column, ascending=True):
+    """Precomputed positional sort index for a column (stable, NaNs last)"""
+    values = df[column].reset_index(drop=True)
+    try:
+        ordered = values.sort_values(ascending=ascending, kind='mergesort', na_position='last')
+    except TypeError:
+        # mixed types (e.g. 1.0 and 'T3') compare as text
+        values = values.where(values.isna(), values.astype(str))
+        ordered = values.sort_values(ascending=ascending, kind='mergesort', na_position='last')
+    return ordered.index.to_numpy()
+
+def paginated_table(df, key, page_size=25, sla_column='SLA %'):
+    """Render only the visible page of rows, with server-side sort and SLA coloring"""
+    if df.empty:
+        st.dataframe(df, use_container_width=True)
+        return
+
+    c1, c2, c3 = st.columns([3, 2, 2])
+    sort_col = c1.selectbox("Sort by", ["(none)"] + list(df.columns), key=f"{key}_sort")
+    descending = c2.checkbox("Descending", key=f"{key}_desc")
+    n_pages = max(1, math.ceil(len(df) / page_size))
+    page = c3.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1, key=f"{key}_page")
+
+    if sort_col == "(none)":
+        order = np.arange(len(df))
+    else:
+        order = sort_order(df, sort_col, ascending=not descending)
+
+    start = (int(page) - 1) * page_size
+    page_df = df.iloc[order[start:start + page_size]]
+
+    if sla_column in page_df.columns:
+        st.dataframe(page_df.style.apply(sla_colors, subset=[sla_column]), use_container_width=True)
+    else:
+        st.dataframe(page_df, use_container_width=True)
+    st.caption(f"Rows {start + 1}-{start + len(page_df)} of {len(df)} · Page {int(page)} of {n_pages}")
+
 def display_summary(df, title):
     st.write(f"### {title}")
-    st.dataframe(df)
+    paginated_table(df, key=f"summary_{title}")
@@ -1,5 +1,24 @@
 # src/data_processing.py
+import hashlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from itertools import repeat
 import pandas as pd
+from src.quantiles import DurationSketch
+
+PERCENTILES = {'P50': 0.5, 'P90': 0.9, 'P99': 0.99}
+SKETCH_KEYS = ['Month', 'Technician Name', 'Company Name']
+
+EXPECTED_COLUMNS = [
+    'Ref', 'Status', 'Start date', 'Closed date',
+    'Organization->Name', 'Agent->Full name', 'Caller->Full name',
+    'SLA tto passed', 'SLA tto over', 'SLA ttr passed', 'SLA ttr over'
+]
+DATE_COLUMNS = ['Start date', 'Closed date']
+TEXT_COLUMNS = [col for col in EXPECTED_COLUMNS if col not in DATE_COLUMNS]
 
 def clean_name(data, col):
     """Remove IDs from names"""
@@ -23,3 +42,141 @@ def compute_kpis(data):
     else:
         data['Duration (days)'] = None
     return data
+
+def build_sketches(data, keys=SKETCH_KEYS, value_col='Duration (days)'):
+    """One duration sketch per finest partition (Month x Technician x Company)"""
+    if value_col not in data.columns or any(key not in data.columns for key in keys):
+        return {}
+    values = pd.to_numeric(data[value_col], errors='coerce')
+    return {
+        group: DurationSketch().update(group_values)
+        for group, group_values in values.groupby([data[key] for key in keys], dropna=False)
+    }
+
+def cached_sketches(data, cache, max_entries=4, keys=SKETCH_KEYS, value_col='Duration (days)'):
+    """Finest-partition sketches, reused from `cache` while those rows are unchanged"""
+    cols = [col for col in keys + [value_col] if col in data.columns]
+    fingerprint = hashlib.sha1(pd.util.hash_pandas_object(data[cols], index=False).to_numpy().tobytes()).hexdigest()
+    if fingerprint not in cache:
+        while len(cache) >= max_entries:
+            cache.pop(next(iter(cache)))
+        cache[fingerprint] = build_sketches(data, keys, value_col)
+    return cache[fingerprint]
+
+def rollup_sketches(sketches, levels, keys=SKETCH_KEYS):
+    """Merge finest-partition sketches up to the given levels, e.g. ['Month']"""
+    positions = [keys.index(level) for level in levels]
+    rolled = {}
+    for key, sketch in sketches.items():
+        group = tuple(key[i] for i in positions)
+        if any(pd.isna(value) for value in group):
+            continue
+        rolled.setdefault(group, DurationSketch()).merge(sketch)
+    return rolled
+
+def merge_sketches(sketches):
+    """Roll several sketches up into one"""
+    merged = DurationSketch()
+    for sketch in sketches:
+        merged.merge(sketch)
+    return merged
+
+def percentile_table(sketches, group_cols):
+    """Resolution-time percentiles per group from its sketch"""
+    rows = []
+    for group, sketch in sketches.items():
+        row = dict(zip(group_cols, group))
+        row['Resolved Tickets'] = sketch.count
+        row['Negative Durations'] = sketch.rejected
+        for label, q in PERCENTILES.items():
+            row[f'{label} Resolution Days'] = round(sketch.quantile(q), 1)
+        rows.append(row)
+    columns = list(group_cols) + ['Resolved Tickets', 'Negative Durations'] + [f'{label} Resolution Days' for label in PERCENTILES]
+    return pd.DataFrame(rows, columns=columns)
+
+def _normalize(col):
+    return ' '.join(str(col).split()).lower()
+
+def align_columns(df, expected=EXPECTED_COLUMNS):
+    """Rename headers to the expected names, ignoring case and extra spaces.
+
+    Returns the aligned frame and the headers dropped because an earlier
+    header already mapped to the same name (e.g. 'Ref' and 'REF').
+    """
+    lookup = {_normalize(col): col for col in expected}
+    names, keep, dropped = [], [], []
+    for col in df.columns:
+        name = lookup.get(_normalize(col), col)
+        if name in names:
+            dropped.append(str(col))
+            keep.append(False)
+        else:
+            names.append(name)
+            keep.append(True)
+    df = df.loc[:, keep]
+    df.columns = names
+    return df, dropped
+
+def _as_text(values):
+    """Text dtype, writing whole-number floats (1.0 from Excel) as '1'"""
+    numeric = pd.to_numeric(values, errors='coerce')
+    whole = numeric.notna() & (numeric % 1 == 0)
+    text = values.astype(object).where(~whole, numeric[whole].astype('int64').astype(str))
+    return text.astype('string')
+
+def read_workbook(name, content, expected=EXPECTED_COLUMNS):
+    """Read every sheet of a workbook that has a Ref column"""
+    start = time.perf_counter()
+    report = {'File': name, 'Sheets Read': 0, 'Sheets Skipped': 0,
+              'Rows': 0, 'Rejected Rows': 0, 'Header Collisions': '',
+              'Parse Seconds': 0.0, 'Error': ''}
+    collisions = []
+    frames = []
+    try:
+        sheets = pd.read_excel(BytesIO(content), sheet_name=None)
+        for sheet, df in sheets.items():
+            df, dropped = align_columns(df, expected)
+            collisions += [f"{sheet}: {col}" for col in dropped]
+            if 'Ref' not in df.columns:
+                report['Sheets Skipped'] += 1
+                continue
+            valid = df['Ref'].notna()
+            report['Rejected Rows'] += int((~valid).sum())
+            df = df[valid].assign(**{'Source File': name, 'Source Sheet': sheet})
+            report['Sheets Read'] += 1
+            report['Rows'] += len(df)
+            frames.append(df)
+    except Exception as e:
+        report['Error'] = str(e)
+    report['Header Collisions'] = ", ".join(collisions)
+    report['Parse Seconds'] = round(time.perf_counter() - start, 3)
+    return frames, report
+
+def load_workbooks(files, expected=EXPECTED_COLUMNS, max_workers=None):
+    """Read (name, bytes) workbooks in parallel processes into one typed frame plus a per-file report"""
+    if len(files) == 1:
+        results = [read_workbook(files[0][0], files[0][1], expected)]
+    else:
+        names, contents = zip(*files)
+        # spawn, not fork: the Streamlit server is multi-threaded
+        workers = min(len(files), max_workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = list(pool.map(read_workbook, names, contents, repeat(expected)))
+
+    frames = [frame for file_frames, _ in results for frame in file_frames]
+    report = pd.DataFrame([file_report for _, file_report in results])
+    if not frames:
+        return pd.DataFrame(columns=expected), report
+
+    data = pd.concat(frames, ignore_index=True, sort=False)
+    ordered = [col for col in expected if col in data.columns]
+    data = data[ordered + [col for col in data.columns if col not in ordered]]
+    for col in DATE_COLUMNS:
+        if col in data.columns:
+            data[col] = pd.to_datetime(data[col], errors='coerce')
+    for col in TEXT_COLUMNS:
+        if col in data.columns:
+            data[col] = _as_text(data[col])
+    for col in ['Source File', 'Source Sheet']:
+        data[col] = data[col].astype('string')
+    return data, report
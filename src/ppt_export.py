@@ -1,4 +1,5 @@
 # src/ppt_export.py
+import pandas as pd
 from pptx import Presentation
 from pptx.util import Inches
 
@@ -9,6 +10,9 @@ def create_ppt(summary_dfs: dict):
     slide.placeholders[1].text = "Generated automatically"
 
     for title, df in summary_dfs.items():
+        if df is None or df.empty:
+            continue
+        df = df.reset_index(drop=True)
         slide = prs.slides.add_slide(prs.slide_layouts[5])
         slide.shapes.title.text = title
         rows, cols = df.shape[0]+1, df.shape[1]
@@ -16,9 +20,9 @@ def create_ppt(summary_dfs: dict):
         table = slide.shapes.add_table(rows, cols, left, top, width, height).table
 
         for col_idx, col_name in enumerate(df.columns):
-            table.cell(0, col_idx).text = col_name
+            table.cell(0, col_idx).text = str(col_name)
 
         for row_idx, row in df.iterrows():
             for col_idx, value in enumerate(row):
-                table.cell(row_idx+1, col_idx).text = str(value)
+                table.cell(row_idx+1, col_idx).text = "" if pd.isna(value) else str(value)
     return prs
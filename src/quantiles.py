@@ -0,0 +1,70 @@
+# src/quantiles.py
+import math
+import numpy as np
+import pandas as pd
+
+class DurationSketch:
+    """Mergeable quantile sketch with bounded relative error (DDSketch style).
+
+    Values are counted in logarithmic buckets, so two sketches merge by adding
+    bucket counts and quantiles never need the raw durations re-sorted.
+    Zero (same-day) values are counted in a zero bucket. Negative values come
+    from a close date before the start date; they are not counted as
+    resolutions but tallied in `rejected` so the data problem stays visible.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+        self.rejected = 0
+
+    def update(self, values):
+        """Add an array of values, ignoring NaNs and rejecting negatives"""
+        values = pd.to_numeric(pd.Series(values), errors='coerce').dropna().to_numpy(dtype=float)
+        negative = values < 0
+        self.rejected += int(negative.sum())
+        values = values[~negative]
+        if values.size == 0:
+            return self
+        positive = values[values > 0]
+        self.zero_count += int(values.size - positive.size)
+        if positive.size:
+            idx = np.ceil(np.log(positive) / self._log_gamma).astype(int)
+            keys, counts = np.unique(idx, return_counts=True)
+            for k, c in zip(keys.tolist(), counts.tolist()):
+                self.buckets[k] = self.buckets.get(k, 0) + c
+        self.count += int(values.size)
+        return self
+
+    def add(self, value):
+        """Add a single value"""
+        return self.update([value])
+
+    def merge(self, other):
+        """Merge another sketch into this one"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for k, c in other.buckets.items():
+            self.buckets[k] = self.buckets.get(k, 0) + c
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.rejected += other.rejected
+        return self
+
+    def quantile(self, q):
+        """Approximate q-quantile (0 <= q <= 1), NaN if empty"""
+        if self.count == 0:
+            return float('nan')
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return 0.0
+        for k in sorted(self.buckets):
+            seen += self.buckets[k]
+            if seen > rank:
+                return 2 * self.gamma ** k / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
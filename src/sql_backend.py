@@ -0,0 +1,238 @@
+# src/sql_backend.py
+import glob
+import os
+import shutil
+import tempfile
+
+try:
+    import duckdb
+    DUCKDB_AVAILABLE = True
+except ImportError:
+    duckdb = None
+    DUCKDB_AVAILABLE = False
+
+TABLE_NAME = "tickets"
+RAW_TABLE = "raw_tickets"
+NAME_COLUMNS = {
+    'Company Name': 'Organization->Name',
+    'Technician Name': 'Agent->Full name',
+    'Caller Name': 'Caller->Full name'
+}
+
+def _quote(col):
+    """Quote a column name for SQL"""
+    return '"' + str(col).replace('"', '""') + '"'
+
+def _literal(value):
+    """Quote a string literal for SQL"""
+    return "'" + str(value).replace("'", "''") + "'"
+
+def _require_duckdb():
+    if not DUCKDB_AVAILABLE:
+        raise ImportError("duckdb is required for the SQL backend")
+
+def new_store():
+    """Temporary store directory for one session, removed when it is garbage collected"""
+    return tempfile.TemporaryDirectory(prefix="ticket_store_")
+
+def _pattern(store_dir):
+    return os.path.join(store_dir, "*.parquet")
+
+def store_exists(store_dir):
+    return bool(glob.glob(_pattern(store_dir)))
+
+def clear_store(store_dir):
+    shutil.rmtree(store_dir, ignore_errors=True)
+
+def write_store(df, store_dir):
+    """Replace the Parquet store with the ingested (raw) tickets"""
+    _require_duckdb()
+    clear_store(store_dir)
+    os.makedirs(store_dir, exist_ok=True)
+    df = df.astype({col: 'string' for col in df.select_dtypes(include='object').columns})
+    con = duckdb.connect()
+    try:
+        con.register("source_df", df)
+        con.execute(f"COPY source_df TO {_literal(os.path.join(store_dir, 'tickets.parquet'))} (FORMAT PARQUET)")
+    finally:
+        con.close()
+    return store_dir
+
+def _read_store(con, store_dir):
+    con.execute(
+        f"CREATE VIEW {RAW_TABLE} AS "
+        f"SELECT * FROM read_parquet({_literal(_pattern(store_dir))}, union_by_name = true)"
+    )
+    return [row[0] for row in con.execute(f"DESCRIBE {RAW_TABLE}").fetchall()]
+
+def store_columns(store_dir):
+    """Raw column names in the store"""
+    _require_duckdb()
+    con = duckdb.connect()
+    try:
+        return _read_store(con, store_dir)
+    finally:
+        con.close()
+
+def load_store(store_dir, limit=None):
+    """Materialize the raw store (or its first rows) as a DataFrame"""
+    _require_duckdb()
+    con = duckdb.connect()
+    try:
+        _read_store(con, store_dir)
+        suffix = f" LIMIT {int(limit)}" if limit else ""
+        return con.execute(f"SELECT * FROM {RAW_TABLE}{suffix}").df()
+    finally:
+        con.close()
+
+def _flag(raw, col, values):
+    """SQL equivalent of the compute_kpis yes/done flags"""
+    if col not in raw:
+        return "0"
+    options = ", ".join(_literal(v) for v in values)
+    return f"CASE WHEN lower(CAST({_quote(col)} AS VARCHAR)) IN ({options}) THEN 1 ELSE 0 END"
+
+def _timestamp(col):
+    return f"TRY_CAST({_quote(col)} AS TIMESTAMP)"
+
+def _ticket_query(raw, search="", since=None, anonymize_columns=()):
+    """clean_data + compute_kpis + search + date window + anonymize, as one SELECT"""
+    derived = {}
+    for name, source in NAME_COLUMNS.items():
+        derived[name] = (
+            f"trim(regexp_replace(CAST({_quote(source)} AS VARCHAR), '[\\s_-]*\\d+$', ''))"
+            if source in raw else "''"
+        )
+    done = _flag(raw, 'Status', ['done', 'closed'])
+    derived['Done Tasks'] = done
+    derived['Pending Tasks'] = f"1 - ({done})" if 'Status' in raw else "0"
+    derived['SLA TTO Done'] = _flag(raw, 'SLA tto passed', ['yes'])
+    derived['SLA TTO Violations'] = _flag(raw, 'SLA tto over', ['yes'])
+    derived['SLA TTR Done'] = _flag(raw, 'SLA ttr passed', ['yes'])
+    derived['SLA TTR Violations'] = _flag(raw, 'SLA ttr over', ['yes'])
+    if 'Start date' in raw and 'Closed date' in raw:
+        derived['Duration (days)'] = (
+            f"COALESCE(floor((epoch({_timestamp('Closed date')}) - epoch({_timestamp('Start date')})) / 86400), 0)"
+        )
+    else:
+        derived['Duration (days)'] = "0"
+    derived['Month'] = (
+        f"COALESCE(strftime({_timestamp('Start date')}, '%Y-%m'), 'NaT')" if 'Start date' in raw else "'Unknown'"
+    )
+
+    overridden = [col for col in derived if col in raw]
+    exclude = f" EXCLUDE ({', '.join(_quote(col) for col in overridden)})" if overridden else ""
+    inner = (
+        f"SELECT *{exclude}, "
+        + ", ".join(f"{expr} AS {_quote(name)}" for name, expr in derived.items())
+        + f" FROM {RAW_TABLE}"
+    )
+
+    clauses = []
+    if since is not None and 'Start date' in raw:
+        clauses.append(f"{_timestamp('Start date')} >= TIMESTAMP {_literal(since.strftime('%Y-%m-%d %H:%M:%S'))}")
+    if search:
+        clauses.append("(" + " OR ".join(
+            f"regexp_matches(COALESCE({_quote(col)}, ''), {_literal(search)}, 'i')" for col in NAME_COLUMNS
+        ) + ")")
+    where = " WHERE " + " AND ".join(clauses) if clauses else ""
+
+    visible = list(dict.fromkeys([col for col in raw if col not in overridden] + list(derived)))
+    replaced = [col for col in anonymize_columns if col in visible]
+    replace = ""
+    if replaced:
+        replace = " REPLACE (" + ", ".join(
+            f"{_literal(col.split('->')[0] + ' ')} || CAST(row_number() OVER () AS VARCHAR) AS {_quote(col)}"
+            for col in replaced
+        ) + ")"
+    return f"SELECT *{replace} FROM ({inner}){where}"
+
+def connect(store_dir, search="", since=None, anonymize_columns=()):
+    """Open an embedded DuckDB connection with the prepared ticket view over the Parquet store.
+
+    Name cleaning, KPI flags, the universal search, the date window and
+    anonymization all run inside the view, so only query results reach pandas.
+    """
+    _require_duckdb()
+    con = duckdb.connect()
+    raw = _read_store(con, store_dir)
+    con.execute(f"CREATE VIEW {TABLE_NAME} AS {_ticket_query(raw, search, since, anonymize_columns)}")
+    return con
+
+def columns(con):
+    """List the columns of the ticket view"""
+    return [row[0] for row in con.execute(f"DESCRIBE {TABLE_NAME}").fetchall()]
+
+def build_where(filters):
+    """Build a WHERE clause and parameters from Explorer filters"""
+    clauses, params = [], []
+    for col, values in (filters or {}).items():
+        if col == 'Ticket Status':
+            if values == 'Closed':
+                clauses.append('"Done Tasks" > 0')
+            elif values == 'Pending':
+                clauses.append('"Pending Tasks" > 0')
+        elif values:
+            placeholders = ", ".join("?" for _ in values)
+            clauses.append(f"{_quote(col)} IN ({placeholders})")
+            params.extend(values)
+    where = " WHERE " + " AND ".join(clauses) if clauses else ""
+    return where, params
+
+def distinct_values(con, col):
+    """Distinct non-null values of a column, for filter options"""
+    if col not in columns(con):
+        return []
+    rows = con.execute(
+        f"SELECT DISTINCT {_quote(col)} FROM {TABLE_NAME} "
+        f"WHERE {_quote(col)} IS NOT NULL ORDER BY 1"
+    ).fetchall()
+    return [row[0] for row in rows]
+
+def query_kpis(con, filters=None):
+    """Compute Explorer KPI card values in SQL"""
+    cols = columns(con)
+    where, params = build_where(filters)
+
+    def agg(func, col):
+        return f"COALESCE({func}({_quote(col)}), 0)" if col in cols else "0"
+
+    select = ", ".join([
+        "COUNT(*)",
+        agg("SUM", 'Done Tasks'),
+        agg("SUM", 'Pending Tasks'),
+        agg("AVG", 'SLA %'),
+        agg("AVG", 'Duration (days)'),
+    ])
+    row = con.execute(f"SELECT {select} FROM {TABLE_NAME}{where}", params).fetchone()
+    return {
+        'total_tickets': int(row[0]),
+        'closed_tickets': int(row[1]),
+        'pending_tickets': int(row[2]),
+        'avg_sla': float(row[3]),
+        'avg_duration': float(row[4]),
+    }
+
+def query_top_performers(con, role_col, filters=None):
+    """SQL equivalent of top_performers: per-role summary and top 5 by SLA %"""
+    where, params = build_where(filters)
+    not_null = f"{_quote(role_col)} IS NOT NULL"
+    where = f"{where} AND {not_null}" if where else f" WHERE {not_null}"
+    summary = con.execute(
+        f"SELECT {_quote(role_col)}, "
+        f"COUNT(\"Ref\") AS Tickets, "
+        f"SUM(\"Done Tasks\") AS Done, "
+        f"SUM(\"SLA TTO Done\") AS SLA_Done, "
+        f"SUM(\"SLA TTR Done\") AS SLA_TTR "
+        f"FROM {TABLE_NAME}{where} "
+        f"GROUP BY {_quote(role_col)}",
+        params
+    ).df()
+    summary['SLA %'] = ((summary['SLA_Done'] + summary['SLA_TTR']) / (summary['Tickets']*2) * 100).round(1)
+    top5 = summary.sort_values('SLA %', ascending=False).head(5)
+    return summary, top5
+
+def count_rows(con, filters=None):
+    """Number of tickets matching the filters"""
+    where, params = build_where(filters)
+    return int(con.execute(f"SELECT COUNT(*) FROM {TABLE_NAME}{where}", params).fetchone()[0])